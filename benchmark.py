@@ -0,0 +1,474 @@
+# benchmark.py
+"""
+Benchmark riproducibile dell'applicazione, da lanciare in locale:
+
+    python benchmark.py                      # scenari completi (avvio, classe, dashboard, report)
+    python benchmark.py --quick              # dimensioni ridotte, per una verifica veloce
+    python benchmark.py --json risultati.json --compare baseline.json
+
+L'app gira in questo processo (server werkzeug multi-thread su una porta libera) con un database
+SQLite, una cartella projects/ e una coda email temporanei: le email finiscono in file (EMAIL_TRANSPORT=file)
+e non escono dalla macchina. Con --workdir i dati generati vengono conservati e riutilizzati
+nelle esecuzioni successive (utile per confrontare più commit sugli stessi dati).
+
+Scenari:
+- startup: avvio a freddo in processi nuovi (import, create_app, prima richiesta) e memoria privata
+  dei worker creati con fork dopo l'avvio, come con gunicorn --preload;
+- classroom: N studenti aprono insieme il link play_online, scaricano gli asset e inviano il risultato;
+- dashboard: migliaia di progetti sintetici, pagine e ricerche della dashboard;
+- reports: milioni di righe sintetiche in GameResult, pagina dei report con filtri e riepiloghi.
+Per ogni tipo di richiesta stampa throughput e latenze p50/p95/p99 (in millisecondi); --json salva
+gli stessi numeri, --compare li confronta con un'esecuzione precedente.
+"""
+import argparse, json, logging, os, random, re, shutil, subprocess, sys, tempfile, threading, time
+import urllib.request, urllib.parse, urllib.error
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULT_INSERT_BATCH = 20000
+STUDENT_NAMES = 5000  # Studenti distinti nelle righe sintetiche dei report
+REPORT_PROJECTS = 200  # Giochi distinti nelle righe sintetiche dei report
+
+
+def percentile(sorted_values, p):
+    """Percentile con il metodo nearest-rank su una lista già ordinata."""
+    if not sorted_values:
+        return None
+    index = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class Recorder:
+    """Raccoglie le latenze (secondi) e gli errori per tipo di richiesta, da più thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, name, seconds, ok=True):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, wall_seconds):
+        summary = {}
+        for name, values in self.samples.items():
+            values = sorted(values)
+            summary[name] = {
+                'requests': len(values),
+                'errors': self.errors.get(name, 0),
+                'throughput_rps': round(len(values) / wall_seconds, 1) if wall_seconds else None,
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p95_ms': round(percentile(values, 95) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+                'max_ms': round(values[-1] * 1000, 2),
+            }
+        return summary
+
+
+def http(recorder, name, url, data=None, headers=None):
+    """Esegue una richiesta e ne registra la latenza. Restituisce (stato, corpo)."""
+    body = json.dumps(data).encode('utf-8') if data is not None else None
+    request = urllib.request.Request(url, data=body, headers=dict(headers or {}))
+    if body is not None:
+        request.add_header('Content-Type', 'application/json')
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            status, content = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, content = e.code, e.read()
+    except OSError:
+        status, content = 0, b''
+    recorder.record(name, time.perf_counter() - start, ok=200 <= status < 400)
+    return status, content
+
+
+def run_concurrently(workers, target):
+    """Avvia `workers` thread che partono insieme; restituisce il tempo totale in secondi."""
+    barrier = threading.Barrier(workers + 1)
+
+    def run(index):
+        barrier.wait()
+        target(index)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+# --- PREPARAZIONE DELL'AMBIENTE ---
+
+def prepare_workdir(workdir):
+    """Imposta database, cartelle ed email dell'app nella cartella di lavoro del benchmark."""
+    os.makedirs(workdir, exist_ok=True)
+    templates_link = os.path.join(workdir, 'project_templates')
+    if not os.path.exists(templates_link):
+        os.symlink(os.path.join(REPO_DIR, 'project_templates'), templates_link)
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'benchmark.db')}",
+        'EMAIL_TRANSPORT': 'file',
+        'EMAIL_FILE_SINK_DIR': os.path.join(workdir, 'outbox'),
+        'SENDER_EMAIL_VERIFIED': 'benchmark@example.org',
+        'MEDIA_FETCHER': 'local',
+        'AUTO_MIGRATE': '1',
+    })
+    os.chdir(workdir)  # Le cartelle dell'app (projects/, storage/, builds/...) sono relative alla directory corrente
+
+
+def load_app(workdir):
+    """Importa main.py (e lo avvia) nella cartella di lavoro del benchmark."""
+    prepare_workdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    import main
+    main.create_app()
+    return main
+
+
+def start_server(app):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # Niente log di accesso per ogni richiesta
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='benchmark-server', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def ensure_online_game(main, base_url):
+    """Crea (una volta sola) il progetto del benchmark e il suo link online."""
+    with main.app.app_context():
+        online_game = main.OnlineGame.query.filter_by(project_name='Benchmark_Quiz').first()
+        if online_game is not None:
+            return online_game.id
+    client = main.app.test_client()
+    client.post('/create_project', data={'project_name': 'Benchmark_Quiz', 'template_type': 'quiz'})
+    response = client.post('/generate_online_link/Benchmark_Quiz', json={'teacher_email': 'docente@example.org'})
+    return response.get_json()['share_url'].rstrip('/').rsplit('/', 1)[1]
+
+
+def ensure_projects(main, count):
+    """Crea progetti sintetici (manifest, index.html e data.json minimi) fino ad averne `count`."""
+    upload_folder = main.app.config['UPLOAD_FOLDER']
+    existing = sum(1 for name in os.listdir(upload_folder) if name.startswith('Sintetico_'))
+    subjects = ('Storia', 'Geografia', 'Scienze', 'Matematica', 'Inglese', 'Musica', 'Arte', 'Italiano')
+    for i in range(existing, count):
+        project_dir = os.path.join(upload_folder, f'Sintetico_{i:05d}')
+        os.makedirs(project_dir, exist_ok=True)
+        manifest = {'name': f'{subjects[i % len(subjects)]} {i}', 'description': f'Progetto sintetico numero {i}',
+                    'template_id': 'quiz'}
+        with open(os.path.join(project_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        with open(os.path.join(project_dir, 'index.html'), 'w', encoding='utf-8') as f:
+            f.write('<!DOCTYPE html><html><head><title>Gioco</title></head><body></body></html>')
+        with open(os.path.join(project_dir, 'data.json'), 'w', encoding='utf-8') as f:
+            json.dump({'questions': []}, f)
+    main.project_catalog.invalidate()
+    if count > existing:
+        # I file sono scritti direttamente, senza passare da create_project: va aggiornato l'indice di ricerca
+        with main.app.app_context(), main.db.engine.begin() as conn:
+            main.rebuild_search_index(conn)
+    return count - existing
+
+
+def ensure_results(main, count, online_game_id):
+    """Inserisce righe sintetiche in GameResult (a lotti, senza passare dall'ORM) fino ad averne `count`."""
+    table = main.GameResult.__table__
+    with main.app.app_context():
+        existing = main.db.session.query(main.db.func.count(main.GameResult.id)).scalar()
+        main.db.session.commit()
+        if existing >= count:
+            return 0
+        rng = random.Random(existing)
+        start = datetime.utcnow() - timedelta(days=365)
+        with main.db.engine.begin() as conn:
+            for offset in range(existing, count, RESULT_INSERT_BATCH):
+                rows = []
+                for i in range(offset, min(offset + RESULT_INSERT_BATCH, count)):
+                    student = rng.randrange(STUDENT_NAMES)
+                    score, max_score = rng.randint(0, 10), 10
+                    duration = rng.randint(20, 900)
+                    rows.append({
+                        'student_name': f'Studente {student}', 'student_email': f'studente{student}@example.org',
+                        'project_name': f'Sintetico_{rng.randrange(REPORT_PROJECTS):05d}',
+                        'score': f'{score} / {max_score}', 'time_spent': f'{duration // 60:02d}:{duration % 60:02d}',
+                        'score_value': score, 'max_score': max_score, 'duration_seconds': duration,
+                        'timestamp': start + timedelta(seconds=i * 365 * 24 * 3600 // max(count, 1)),
+                        'online_game_id': online_game_id, 'teacher_email': 'docente@example.org',
+                    })
+                conn.execute(table.insert(), rows)
+            # Le statistiche dei riepiloghi si basano sulle tabelle di aggregazione
+            main.rebuild_rollups(conn)
+    return count - existing
+
+
+# --- SCENARI ---
+
+BASE_RE = re.compile(r'<base href="([^"]+)"\s*/?>')
+ASSET_RE = re.compile(r'''\b(?:src|href)\s*=\s*["']([^"'#]+)["']''')
+
+
+def classroom_scenario(base_url, online_game_id, students, rounds):
+    """N studenti aprono il gioco insieme, scaricano gli asset e inviano il risultato."""
+    recorder = Recorder()
+    page_url = f"{base_url}/play_online/{online_game_id}"
+    wall = 0.0
+    for round_number in range(rounds):
+        def student(index):
+            start = time.perf_counter()
+            status, html = http(recorder, 'play_online_game', page_url)
+            text = html.decode('utf-8', 'replace')
+            base = BASE_RE.search(text)
+            base_href = urllib.parse.urljoin(page_url, base.group(1)) if base else page_url + '/'
+            for reference in dict.fromkeys(ASSET_RE.findall(BASE_RE.sub('', text))):
+                if reference.startswith(('http:', 'https:', 'data:')):
+                    continue
+                http(recorder, 'asset', urllib.parse.urljoin(base_href, reference))
+            payload = {'name': f'Studente {index}', 'email': f'studente{index}@example.org',
+                       'score': f'{random.randint(0, 10)} / 10', 'time': f'00:{random.randint(10, 59)}'}
+            http(recorder, 'submit_result', f"{base_url}/api/submit_result/{online_game_id}", data=payload,
+                 headers={'Idempotency-Key': f'bench-{os.getpid()}-{round_number}-{index}-{time.time_ns()}'})
+            recorder.record('student_session', time.perf_counter() - start, ok=status == 200)
+        wall += run_concurrently(students, student)
+    return recorder.summary(wall)
+
+
+def dashboard_scenario(base_url, requests_count, concurrency):
+    """Pagine e ricerche della dashboard con migliaia di progetti."""
+    recorder = Recorder()
+    http(recorder, 'dashboard_cold', f"{base_url}/dashboard")  # Prima richiesta: il catalogo viene costruito
+
+    def user(index):
+        rng = random.Random(index)
+        for _ in range(requests_count // concurrency):
+            if rng.random() < 0.5:
+                http(recorder, 'dashboard_page', f"{base_url}/dashboard?page={rng.randint(1, 50)}")
+            else:
+                query = rng.choice(('Storia', 'Scienze 1', 'sintetico numero 42', 'Musica'))
+                http(recorder, 'dashboard_search', f"{base_url}/dashboard?q={urllib.parse.quote(query)}")
+    wall = run_concurrently(concurrency, user)
+    return recorder.summary(wall)
+
+
+def reports_scenario(base_url, requests_count, concurrency):
+    """Pagina dei report (prima pagina, filtri, pagine successive) e riepiloghi su milioni di righe."""
+    recorder = Recorder()
+    http(recorder, 'reports_cold', f"{base_url}/reports")  # Prima richiesta: vengono caricati i filtri
+
+    def user(index):
+        rng = random.Random(index)
+        for _ in range(requests_count // concurrency):
+            choice = rng.random()
+            if choice < 0.25:
+                http(recorder, 'reports_first_page', f"{base_url}/reports")
+            elif choice < 0.5:
+                student = rng.randrange(STUDENT_NAMES)
+                http(recorder, 'reports_by_student', f"{base_url}/reports?student_email=studente{student}%40example.org")
+            elif choice < 0.7:
+                project = f'Sintetico_{rng.randrange(REPORT_PROJECTS):05d}'
+                status, html = http(recorder, 'reports_by_project', f"{base_url}/reports?project_name={project}")
+                cursor = re.search(r'before=([^&"]+)', html.decode('utf-8', 'replace'))
+                if cursor:
+                    http(recorder, 'reports_next_page',
+                         f"{base_url}/reports?project_name={project}&before={cursor.group(1)}")
+            elif choice < 0.85:
+                http(recorder, 'reports_summary', f"{base_url}/api/reports/summary")
+            else:
+                project = f'Sintetico_{rng.randrange(REPORT_PROJECTS):05d}'
+                http(recorder, 'reports_project_summary', f"{base_url}/api/reports/summary/projects/{project}")
+    wall = run_concurrently(concurrency, user)
+    return recorder.summary(wall)
+
+
+# --- OUTPUT ---
+
+# --- AVVIO A FREDDO E MEMORIA DEI WORKER ---
+
+def _memory_mb(fields):
+    """Valori (in MB) di /proc/self/smaps_rollup; None dove non disponibile (non Linux)."""
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            values = {line.split(':')[0]: int(line.split()[1]) for line in f if line.split()[-1] == 'kB'}
+    except OSError:
+        return {field: None for field in fields}
+    return {field: round(sum(values.get(k, 0) for k in keys) / 1024, 1) for field, keys in fields.items()}
+
+
+def startup_probe(workers):
+    """
+    Eseguita in un processo nuovo (--startup-probe): misura import e avvio dell'app, la prima
+    richiesta e la memoria. Poi crea `workers` processi figli con fork, come gunicorn --preload, e
+    misura quanta memoria diventa privata di ciascun worker dopo alcune richieste.
+    """
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    app = main.create_app()
+    started = time.perf_counter()
+    client = app.test_client()
+    client.get('/create_project')
+    client.get('/dashboard')
+    first_request = time.perf_counter()
+    probe = {'import_ms': round((imported - start) * 1000, 1),
+             'create_app_ms': round((started - imported) * 1000, 1),
+             'first_request_ms': round((first_request - started) * 1000, 1),
+             **_memory_mb({'rss_mb': ('Rss',)})}
+
+    worker_memory = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            for path in ('/create_project', '/dashboard', '/dashboard?q=quiz', '/reports'):
+                app.test_client().get(path)
+            memory = _memory_mb({'worker_private_mb': ('Private_Clean', 'Private_Dirty'), 'worker_pss_mb': ('Pss',)})
+            os.write(write_fd, json.dumps(memory).encode('utf-8'))
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as f:
+            worker_memory.append(json.loads(f.read()))
+        os.waitpid(pid, 0)
+    for key in ('worker_private_mb', 'worker_pss_mb'):
+        values = sorted(m[key] for m in worker_memory if m[key] is not None)
+        probe[key] = values[len(values) // 2] if values else None
+    print(json.dumps(probe))
+
+
+def startup_scenario(runs, workers):
+    """Lancia `runs` processi nuovi con startup_probe e restituisce la mediana di ogni misura."""
+    probes = []
+    for run in range(runs + 1):
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--startup-probe', '--workers', str(workers)],
+                                   capture_output=True, text=True, check=True)
+        if run > 0:  # Il primo avvio applica le eventuali migrazioni e riempie la cache del sistema operativo
+            probes.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    summary = {}
+    for key in probes[0]:
+        values = sorted(p[key] for p in probes if p[key] is not None)
+        summary[key] = values[len(values) // 2] if values else None
+    return summary
+
+
+def print_startup(summary, baseline=None):
+    print(f"\n== startup: avvio a freddo e memoria per worker (mediana) ==")
+    for key, value in summary.items():
+        old = (baseline or {}).get(key)
+        change = f"   (prima {old}, {(value - old) / old * 100:+.1f}%)" if old and value is not None else ''
+        print(f"{key:<26}{value:>10}{change}")
+
+
+def print_summary(title, summary):
+    print(f"\n== {title} ==")
+    print(f"{'richiesta':<26}{'n':>7}{'errori':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in sorted(summary.items()):
+        print(f"{name:<26}{row['requests']:>7}{row['errors']:>8}{row['throughput_rps']:>9}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+
+def print_comparison(results, baseline):
+    print(f"\n== Confronto con {baseline.get('commit') or 'baseline'} (p50 / p95, variazione %) ==")
+    if results.get('startup') and baseline.get('startup'):
+        print_startup(results['startup'], baseline['startup'])
+    for scenario, summary in results['scenarios'].items():
+        for name, row in sorted(summary.items()):
+            old = baseline.get('scenarios', {}).get(scenario, {}).get(name)
+            if not old:
+                continue
+            changes = []
+            for key in ('p50_ms', 'p95_ms'):
+                delta = (row[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                changes.append(f"{old[key]} -> {row[key]} ({delta:+.1f}%)")
+            print(f"{scenario + '/' + name:<40}{'   '.join(changes)}")
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark dei giochi online, della dashboard e dei report.")
+    parser.add_argument('--scenarios', default='startup,classroom,dashboard,reports',
+                        help="scenari da eseguire, separati da virgola")
+    parser.add_argument('--students', type=int, default=40, help="studenti contemporanei nello scenario classroom")
+    parser.add_argument('--rounds', type=int, default=5, help="ripetizioni dello scenario classroom")
+    parser.add_argument('--projects', type=int, default=3000, help="progetti sintetici per la dashboard")
+    parser.add_argument('--results', type=int, default=1000000, help="righe sintetiche di GameResult per i report")
+    parser.add_argument('--requests', type=int, default=400, help="richieste per gli scenari dashboard e reports")
+    parser.add_argument('--concurrency', type=int, default=8, help="client contemporanei per dashboard e reports")
+    parser.add_argument('--startup-runs', type=int, default=5, help="avvii a freddo misurati nello scenario startup")
+    parser.add_argument('--workers', type=int, default=4, help="worker simulati (fork) nello scenario startup")
+    parser.add_argument('--startup-probe', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--quick', action='store_true', help="dimensioni ridotte per una verifica veloce")
+    parser.add_argument('--workdir', help="cartella dei dati (conservata e riutilizzata); default: temporanea")
+    parser.add_argument('--json', dest='json_path', help="salva i risultati in questo file JSON")
+    parser.add_argument('--compare', help="file JSON di un'esecuzione precedente da confrontare")
+    args = parser.parse_args()
+    if args.startup_probe:
+        # Processo figlio dello scenario startup: ambiente e cartella di lavoro sono già quelli del benchmark
+        sys.path.insert(0, REPO_DIR)
+        startup_probe(args.workers)
+        return
+    if args.quick:
+        args.startup_runs, args.workers = 3, 2
+        args.students, args.rounds, args.projects = 10, 2, 300
+        args.results, args.requests, args.concurrency = 20000, 80, 4
+
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix='giochi-benchmark-')
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    try:
+        if 'startup' in scenarios:
+            # Prima di importare main in questo processo: ogni misura parte da un processo nuovo
+            prepare_workdir(workdir)
+            startup_results = startup_scenario(args.startup_runs, args.workers)
+            print_startup(startup_results)
+        main = load_app(workdir)
+        server, base_url = start_server(main.app)
+        online_game_id = ensure_online_game(main, base_url)
+        results = {'commit': current_commit(), 'date': datetime.utcnow().isoformat(), 'parameters': vars(args),
+                   'scenarios': {}}
+        if 'startup' in scenarios:
+            results['startup'] = startup_results
+
+        if 'classroom' in scenarios:
+            results['scenarios']['classroom'] = classroom_scenario(base_url, online_game_id, args.students, args.rounds)
+            print_summary(f"classroom: {args.students} studenti x {args.rounds} turni", results['scenarios']['classroom'])
+        if 'dashboard' in scenarios:
+            start = time.perf_counter()
+            created = ensure_projects(main, args.projects)
+            print(f"\nProgetti sintetici: {args.projects} ({created} creati in {time.perf_counter() - start:.1f} s)")
+            results['scenarios']['dashboard'] = dashboard_scenario(base_url, args.requests, args.concurrency)
+            print_summary(f"dashboard: {args.projects} progetti", results['scenarios']['dashboard'])
+        if 'reports' in scenarios:
+            start = time.perf_counter()
+            created = ensure_results(main, args.results, online_game_id)
+            print(f"\nRisultati sintetici: {args.results} ({created} inseriti in {time.perf_counter() - start:.1f} s)")
+            results['scenarios']['reports'] = reports_scenario(base_url, args.requests, args.concurrency)
+            print_summary(f"reports: {args.results} risultati", results['scenarios']['reports'])
+
+        server.shutdown()
+        if json_path:
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"\nRisultati salvati in {json_path}")
+        if compare_path:
+            with open(compare_path, 'r', encoding='utf-8') as f:
+                print_comparison(results, json.load(f))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,20 @@
+# gunicorn.conf.py
+# Configurazione di gunicorn, letta automaticamente quando gunicorn parte da questa cartella.
+
+# create_app() gira una volta nel master (migrazioni, template, catalogo) e i worker nascono già pronti
+wsgi_app = 'main:create_app()'
+preload_app = True
+
+# Gli stream dei risultati in diretta occupano un thread ciascuno per tutta la loro durata
+worker_class = 'gthread'
+threads = 16
+
+
+def post_worker_init(worker):
+    # SIGUSR2 al singolo worker fa rileggere project_templates/ (al master gunicorn lo usa per
+    # l'aggiornamento a caldo dell'eseguibile). In alternativa basta attendere: il registro
+    # ricontrolla i file da solo ogni CATALOG_RECHECK_SECONDS.
+    from main import template_registry, email_sender
+    template_registry.install_signal_handler()
+    # Ogni worker invia subito le email rimaste in coda (o in attesa di un nuovo tentativo) prima del riavvio
+    email_sender.start()
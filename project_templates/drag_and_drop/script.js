@@ -171,27 +171,17 @@ document.addEventListener('DOMContentLoaded', () => {
         };
 
         try {
-            // L'ID del gioco viene preso dalla variabile globale `gameId`
-            const response = await fetch(`/api/submit_result/${gameId}`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(payload)
-            });
-
-            if (!response.ok) {
-                 throw new Error('Errore durante l\'invio dei risultati.');
-            }
-            
-            const result = await response.json();
-            if (result.status === 'success') {
+            // Il risultato viene salvato sul dispositivo e inviato appena c'è connessione (vedi game_shell.js)
+            const result = await GameShell.submitResult(gameId, payload);
+            if (result.sent) {
                 alert("Risultati inviati con successo all'insegnante!");
             } else {
-                alert(`Errore nell'invio dei risultati: ${result.message}`);
+                alert("Sei offline: i risultati sono salvati e verranno inviati all'insegnante appena torna la connessione.");
             }
 
         } catch (error) {
             console.error("Errore nell'invio dei risultati:", error);
-            alert("Errore di rete. Impossibile inviare i risultati.");
+            alert(`Errore nell'invio dei risultati: ${error.message}`);
         }
     }
 
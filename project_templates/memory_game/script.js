@@ -202,22 +202,12 @@ document.addEventListener('DOMContentLoaded', () => {
         formFeedback.textContent = 'Invio in corso...';
 
         try {
-            // L'ID del gioco viene preso dalla variabile globale `gameId`
-            const response = await fetch(`/api/submit_result/${gameId}`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(payload)
-            });
-            
-            const result = await response.json();
-            if (!response.ok) throw new Error(result.message || 'Errore di rete.');
-
-            if (result.status === 'success') {
-                formFeedback.textContent = "Risultati inviati con successo!";
-                resultForm.style.display = 'none'; // Nasconde il form dopo l'invio
-            } else {
-                throw new Error(result.message || 'Errore sconosciuto.');
-            }
+            // Il risultato viene salvato sul dispositivo e inviato appena c'è connessione (vedi game_shell.js)
+            const result = await GameShell.submitResult(gameId, payload);
+            formFeedback.textContent = result.sent
+                ? "Risultati inviati con successo!"
+                : "Sei offline: i risultati sono salvati e verranno inviati appena torna la connessione.";
+            resultForm.style.display = 'none'; // Nasconde il form dopo l'invio
 
         } catch (error) {
             console.error("Errore nell'invio dei risultati:", error);
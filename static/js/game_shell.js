@@ -0,0 +1,157 @@
+// Guscio comune dei giochi online, inserito dal server in ogni pagina di gioco.
+// - I risultati vengono prima salvati sul dispositivo (localStorage) e poi inviati a
+//   /api/submit_results: se la rete della scuola cade, non si perdono e vengono ritentati
+//   con attese crescenti. Ogni risultato ha un submission_id, così i reinvii non creano doppioni.
+// - Registra il service worker del gioco, che tiene in cache pagina, asset e dati
+//   per continuare a giocare anche offline.
+(function (global) {
+    const QUEUE_KEY = 'giochi.risultatiInSospeso';
+    const BATCH_SIZE = 100;
+    const RETRY_BASE_MS = 2000;
+    const RETRY_MAX_MS = 5 * 60 * 1000;
+    const RECONNECT_SPREAD_MS = 10000; // Al ritorno della rete i dispositivi non inviano tutti nello stesso istante
+
+    const shellScript = document.currentScript;
+    let memoryQueue = []; // Usata se localStorage non è disponibile (es. navigazione privata)
+    let attempt = 0;
+    let retryTimer = null;
+    let flushing = null;
+    const rejections = new Map();
+
+    function loadQueue() {
+        try {
+            return JSON.parse(localStorage.getItem(QUEUE_KEY)) || [];
+        } catch (e) {
+            return memoryQueue;
+        }
+    }
+
+    function saveQueue(queue) {
+        memoryQueue = queue;
+        try {
+            localStorage.setItem(QUEUE_KEY, JSON.stringify(queue));
+        } catch (e) {
+            console.warn('Impossibile salvare i risultati sul dispositivo:', e);
+        }
+    }
+
+    function newSubmissionId() {
+        if (global.crypto && crypto.randomUUID) return crypto.randomUUID();
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+    }
+
+    function scheduleRetry(minDelayMs = 0) {
+        if (retryTimer) return;
+        attempt++;
+        const backoff = Math.min(RETRY_BASE_MS * 2 ** attempt, RETRY_MAX_MS) * (0.5 + Math.random());
+        retryTimer = setTimeout(() => {
+            retryTimer = null;
+            flush();
+        }, Math.max(backoff, minDelayMs));
+    }
+
+    function retryAfterMs(response) {
+        const seconds = parseInt(response.headers.get('Retry-After'), 10);
+        return Number.isFinite(seconds) ? seconds * 1000 : 0;
+    }
+
+    async function sendPending() {
+        while (true) {
+            const batch = loadQueue().slice(0, BATCH_SIZE);
+            if (batch.length === 0) {
+                attempt = 0;
+                return;
+            }
+
+            let response;
+            try {
+                response = await fetch('/api/submit_results', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ results: batch })
+                });
+            } catch (e) {
+                scheduleRetry(); // Rete assente: si riprova più tardi
+                return;
+            }
+            if (response.status >= 500 || response.status === 429) {
+                scheduleRetry(retryAfterMs(response));
+                return;
+            }
+
+            const outcome = await response.json().catch(() => null);
+            const done = new Set();
+            batch.forEach((item, i) => {
+                const status = response.ok && outcome && outcome.results ? outcome.results[i] : null;
+                if (status && (status.status === 'created' || status.status === 'duplicate')) {
+                    done.add(item.submission_id);
+                } else if (!status || !status.retry) {
+                    // Risultato rifiutato dal server (dati non validi): ritentarlo non servirebbe
+                    done.add(item.submission_id);
+                    const details = status && status.details ? status.details.join('; ') : (outcome && outcome.error);
+                    rejections.set(item.submission_id, details || 'Risultato non valido.');
+                }
+            });
+            // Rilegge la coda: nel frattempo un'altra scheda può aver aggiunto risultati
+            saveQueue(loadQueue().filter(item => !done.has(item.submission_id)));
+            if (done.size < batch.length) {
+                scheduleRetry();
+                return;
+            }
+            attempt = 0;
+        }
+    }
+
+    function flush() {
+        if (!flushing) {
+            flushing = sendPending().finally(() => { flushing = null; });
+        }
+        return flushing;
+    }
+
+    function isPending(submissionId) {
+        return loadQueue().some(item => item.submission_id === submissionId);
+    }
+
+    // Salva il risultato sul dispositivo e prova a inviarlo. Restituisce { sent: true } se è arrivato
+    // al server, { sent: false } se resta in coda; viene rifiutata solo se il server scarta i dati.
+    async function submitResult(gameId, payload) {
+        if (!gameId) throw new Error("L'invio dei risultati è disponibile solo nel gioco online.");
+        const item = Object.assign({}, payload, {
+            game_id: gameId,
+            submission_id: newSubmissionId(),
+            played_at: new Date().toISOString()
+        });
+        saveQueue(loadQueue().concat([item]));
+
+        await flush();
+        if (isPending(item.submission_id) && !retryTimer) await flush(); // Era già in corso un invio precedente
+        if (rejections.has(item.submission_id)) {
+            const message = rejections.get(item.submission_id);
+            rejections.delete(item.submission_id);
+            throw new Error(message);
+        }
+        return { sent: !isPending(item.submission_id) };
+    }
+
+    global.addEventListener('online', () => {
+        attempt = 0;
+        clearTimeout(retryTimer);
+        retryTimer = setTimeout(() => {
+            retryTimer = null;
+            flush();
+        }, Math.random() * RECONNECT_SPREAD_MS);
+    });
+
+    global.addEventListener('load', () => {
+        if (loadQueue().length > 0) setTimeout(flush, Math.random() * RECONNECT_SPREAD_MS / 3);
+
+        const serviceWorkerUrl = shellScript && shellScript.dataset.serviceWorker;
+        if (serviceWorkerUrl && 'serviceWorker' in navigator) {
+            navigator.serviceWorker.register(serviceWorkerUrl, { scope: shellScript.dataset.scope })
+                .catch(error => console.warn('Service worker non registrato:', error));
+        }
+    });
+
+    global.GameShell = { submitResult, flush, pendingCount: () => loadQueue().length };
+})(window);
@@ -0,0 +1,57 @@
+// Calcola una JSON Patch (RFC 6902) che trasforma `before` in `after`.
+// Gli editor visuali la inviano al server al posto dell'intero data.json:
+// un salvataggio costa quanto la modifica, non quanto il documento.
+(function (global) {
+    function escapeToken(token) {
+        return String(token).replace(/~/g, '~0').replace(/\//g, '~1');
+    }
+
+    function isObject(value) {
+        return value !== null && typeof value === 'object' && !Array.isArray(value);
+    }
+
+    function sameValue(a, b) {
+        return JSON.stringify(a) === JSON.stringify(b);
+    }
+
+    function diff(before, after, path, ops) {
+        if (sameValue(before, after)) return;
+
+        if (isObject(before) && isObject(after)) {
+            Object.keys(before).forEach(key => {
+                if (!(key in after)) ops.push({ op: 'remove', path: `${path}/${escapeToken(key)}` });
+            });
+            Object.keys(after).forEach(key => {
+                const childPath = `${path}/${escapeToken(key)}`;
+                if (!(key in before)) ops.push({ op: 'add', path: childPath, value: after[key] });
+                else diff(before[key], after[key], childPath, ops);
+            });
+            return;
+        }
+
+        if (Array.isArray(before) && Array.isArray(after)) {
+            // Salta gli elementi uguali in testa e in coda: aggiungere o togliere
+            // una domanda in mezzo produce una sola operazione.
+            let start = 0;
+            while (start < before.length && start < after.length && sameValue(before[start], after[start])) start++;
+            let endBefore = before.length, endAfter = after.length;
+            while (endBefore > start && endAfter > start && sameValue(before[endBefore - 1], after[endAfter - 1])) {
+                endBefore--;
+                endAfter--;
+            }
+            const common = Math.min(endBefore - start, endAfter - start);
+            for (let i = 0; i < common; i++) diff(before[start + i], after[start + i], `${path}/${start + i}`, ops);
+            for (let i = endBefore - 1; i >= start + common; i--) ops.push({ op: 'remove', path: `${path}/${i}` });
+            for (let i = start + common; i < endAfter; i++) ops.push({ op: 'add', path: `${path}/${i}`, value: after[i] });
+            return;
+        }
+
+        ops.push({ op: 'replace', path: path, value: after });
+    }
+
+    global.createJsonPatch = function (before, after) {
+        const ops = [];
+        diff(before, after, '', ops);
+        return ops;
+    };
+})(window);
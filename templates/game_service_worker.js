@@ -0,0 +1,64 @@
+// Service worker di un gioco online (generato da game_service_worker in main.py).
+// La cache ha il nome della versione del progetto: quando l'insegnante modifica il gioco
+// il file cambia, il browser installa il nuovo service worker e la cache vecchia viene eliminata.
+const CACHE_NAME = {{ cache_name|tojson }};
+const PAGE_URL = {{ page_url|tojson }};
+// Pagina e guscio comune (static/js/game_shell.js): non hanno l'hash nell'URL, quindi si preferisce la rete
+const NETWORK_FIRST_URLS = {{ network_first_urls|tojson }};
+const PRECACHE_URLS = {{ precache_urls|tojson }};
+const CACHED_PREFIXES = {{ cached_prefixes|tojson }};
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE_NAME)
+            .then(cache => cache.addAll(PRECACHE_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(
+                names.filter(name => name.startsWith('gioco-') && name.split(':')[0] === CACHE_NAME.split(':')[0] && name !== CACHE_NAME)
+                    .map(name => caches.delete(name))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return; // L'invio dei risultati passa sempre dalla rete
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (NETWORK_FIRST_URLS.includes(url.pathname)) {
+        // Pagina del gioco e guscio: prima la rete (per avere le modifiche), la copia in cache se si è offline
+        event.respondWith(
+            fetch(request)
+                .then(response => {
+                    if (response.ok) {
+                        const copy = response.clone();
+                        caches.open(CACHE_NAME).then(cache => cache.put(url.pathname, copy));
+                    }
+                    return response;
+                })
+                .catch(() => caches.match(url.pathname))
+        );
+        return;
+    }
+
+    if (CACHED_PREFIXES.some(prefix => url.pathname.startsWith(prefix))) {
+        // Asset e media: prima la cache, poi la rete (salvando la risposta per la prossima volta)
+        event.respondWith(
+            caches.match(request).then(cached => cached || fetch(request).then(response => {
+                if (response.ok) {
+                    const copy = response.clone();
+                    caches.open(CACHE_NAME).then(cache => cache.put(request, copy));
+                }
+                return response;
+            }))
+        );
+    }
+});